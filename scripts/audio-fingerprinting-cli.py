@@ -183,11 +183,46 @@
 #     main()
 
 
+import os
 import click
 import logging
-from src.core import RobustAudioFingerprinter, parallel_fingerprint
+from typing import Iterator
+from src.core import RobustAudioFingerprinter, fingerprint_to_database, load_audio
 from src.database import AudioFingerprintDatabase
-from src.config import ConfigManager
+from src.config import load_config
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.flac', '.ogg')
+
+logger = logging.getLogger(__name__)
+
+def _fingerprinter_params(config) -> dict:
+    """Fingerprinter settings, shared by indexing and matching"""
+    return {
+        'sample_rate': config.sample_rate,
+        'n_fft': config.n_fft,
+        'hop_length': config.hop_length,
+        'max_peaks': config.max_peaks
+    }
+
+def _iter_audio(root: str, recursive: bool) -> Iterator[str]:
+    """Yield audio file paths under root, descending only if recursive"""
+    stack = [root]
+    while stack:
+        path = stack.pop()
+        try:
+            entries = os.scandir(path)
+        except OSError as e:
+            # Skip unreadable directories like os.walk does
+            logger.warning(f"Skipping {path}: {e}")
+            continue
+        
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        stack.append(entry.path)
+                elif entry.is_file() and entry.name.lower().endswith(AUDIO_EXTENSIONS):
+                    yield entry.path
 
 @click.group()
 def cli():
@@ -199,49 +234,44 @@ def cli():
 @click.option('--recursive', is_flag=True, help='Search subdirectories')
 def fingerprint(directory, recursive):
     """Fingerprint audio files in a directory"""
-    config = ConfigManager()
-    database = AudioFingerprintDatabase(config.get('database.path'))
-    fingerprinter = RobustAudioFingerprinter()
-
-    # Process directory
-    audio_files = []
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if file.lower().endswith(('.mp3', '.wav', '.flac', '.ogg')):
-                audio_files.append(os.path.join(root, file))
-                if not recursive:
-                    break
-
-    # Parallel fingerprinting
-    fingerprints = parallel_fingerprint(audio_files)
-    
-    # Insert into database
-    database.insert_fingerprints(fingerprints)
+    config = load_config()
+
+    # Parallel fingerprinting of the directory, streamed into the database
+    with AudioFingerprintDatabase(config.database_path) as database:
+        track_ids = fingerprint_to_database(
+            _iter_audio(directory, recursive), 
+            database, 
+            fingerprinter_params=_fingerprinter_params(config)
+        )
     
-    click.echo(f"Processed {len(fingerprints)} tracks")
+    click.echo(f"Processed {len(track_ids)} tracks")
 
 @cli.command()
 @click.argument('audio_file', type=click.Path(exists=True))
 def match(audio_file):
     """Match an audio file against the database"""
-    config = ConfigManager()
-    database = AudioFingerprintDatabase(config.get('database.path'))
-    fingerprinter = RobustAudioFingerprinter()
+    config = load_config()
+    fingerprinter = RobustAudioFingerprinter(**_fingerprinter_params(config))
 
     # Load and fingerprint sample
-    sample_audio, _ = librosa.load(audio_file, sr=16000)
+    sample_audio = load_audio(audio_file, sample_rate=fingerprinter.sample_rate)
     sample_fingerprints = fingerprinter.fingerprint_audio(sample_audio)
 
-    # Match against database
-    matches = database.match_fingerprint(sample_fingerprints)
+    with AudioFingerprintDatabase(config.database_path) as database:
+        # Match against database
+        matches = database.match_fingerprint(
+            sample_fingerprints, 
+            threshold=config.match_threshold, 
+            max_results=config.max_match_results
+        )
 
-    if matches:
-        click.echo("Matches found:")
-        for track_id, confidence in matches:
-            metadata = database.get_track_metadata(track_id)
-            click.echo(f"Track: {metadata.get('filename', 'Unknown')} - Confidence: {confidence:.2f}")
-    else:
-        click.echo("No matches found")
+        if matches:
+            click.echo("Matches found:")
+            for track_id, confidence in matches:
+                metadata = database.get_track_metadata(track_id)
+                click.echo(f"Track: {metadata.get('filename') or 'Unknown'} - Confidence: {confidence}")
+        else:
+            click.echo("No matches found")
 
 def main():
     cli()
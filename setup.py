@@ -9,10 +9,15 @@ setup(
         'click==8.1.3',
         'numpy==1.22.4',
         'librosa==0.9.1',
+        'soundfile==0.10.3.post1',
+        'numba==0.55.2',
         'python-dotenv==0.20.0',
         'pyyaml==6.0',
         'sqlalchemy==1.4.36'
     ],
+    extras_require={
+        'fftw': ['pyfftw==0.13.0'],
+    },
     entry_points={
         'console_scripts': [
             'audio-fingerprint=scripts.cli:main',
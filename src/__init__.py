@@ -1,11 +1,13 @@
 # Import key classes and functions to make them easily accessible
 from .core import RobustAudioFingerprinter, parallel_fingerprint
 from .database import AudioFingerprintDatabase
-from .config import ConfigManager
+from .config import Config, ConfigManager, load_config
 
 __all__ = [
     'RobustAudioFingerprinter',
     'parallel_fingerprint',
     'AudioFingerprintDatabase',
-    'ConfigManager'
+    'Config',
+    'ConfigManager',
+    'load_config'
 ]
\ No newline at end of file
@@ -1,26 +1,45 @@
 import os
 import yaml
 import logging
+import functools
+from dataclasses import dataclass
 from typing import Dict, Any
 import argparse
 from dotenv import load_dotenv
 
+# Sentinel distinguishing "not cached" from a cached miss, stored as None
+_MISSING = object()
+
+@dataclass(frozen=True)
+class Config:
+    """
+    Immutable snapshot of the resolved configuration
+    """
+    database_path: str
+    database_max_connections: int
+    sample_rate: int
+    n_fft: int
+    hop_length: int
+    max_peaks: int
+    match_threshold: float
+    max_match_results: int
+    log_level: str
+    log_file: str
+
 class ConfigManager:
     """
     Centralized configuration management for audio fingerprinting system
     """
-    _instance = None
-    
-    def __new__(cls):
-        if not cls._instance:
-            cls._instance = super().__new__(cls)
-            cls._instance._initialize()
-        return cls._instance
+    def __init__(self):
+        self._initialize()
     
     def _initialize(self):
         """
         Initialize configuration from multiple sources
         """
+        # Resolved values of dot-separated keys
+        self._cache = {}
+        
         # Load environment variables
         load_dotenv()
         
@@ -85,6 +104,7 @@ class ConfigManager:
             return base
         
         self.config = deep_merge(self.config, yaml_config)
+        self._cache.clear()
     
     def get(self, key: str, default: Any = None) -> Any:
         """
@@ -97,19 +117,41 @@ class ConfigManager:
         Returns:
             Configuration value
         """
+        value = self._cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return default if value is None else value
+        
         keys = key.split('.')
         value = self.config
         
         for k in keys:
-            if isinstance(value, dict):
-                value = value.get(k)
-            else:
-                return default
-            
+            value = value.get(k) if isinstance(value, dict) else None
             if value is None:
-                return default
+                break
         
-        return value
+        # Misses are cached too; the caller's default is applied on the way out
+        self._cache[key] = value
+        return default if value is None else value
+    
+    def as_config(self) -> Config:
+        """
+        Freeze the current configuration
+        
+        Returns:
+            Immutable configuration snapshot
+        """
+        return Config(
+            database_path=self.get('database.path'),
+            database_max_connections=self.get('database.max_connections'),
+            sample_rate=self.get('fingerprinting.sample_rate'),
+            n_fft=self.get('fingerprinting.n_fft'),
+            hop_length=self.get('fingerprinting.hop_length'),
+            max_peaks=self.get('fingerprinting.max_peaks'),
+            match_threshold=self.get('matching.threshold'),
+            max_match_results=self.get('matching.max_results'),
+            log_level=self.get('logging.level'),
+            log_file=self.get('logging.file')
+        )
     
     def setup_logging(self):
         """
@@ -128,6 +170,16 @@ class ConfigManager:
             ]
         )
 
+@functools.lru_cache(maxsize=1)
+def load_config() -> Config:
+    """
+    Load the configuration once per process
+    
+    Returns:
+        Shared immutable configuration
+    """
+    return ConfigManager().as_config()
+
 class PerformanceMonitor:
     """
     Performance monitoring and metrics collection
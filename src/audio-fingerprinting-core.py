@@ -1,11 +1,14 @@
 import numpy as np
 import librosa
-import hashlib
+import soundfile as sf
+from numba import njit
 import logging
-from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass
+from typing import List, Dict, Tuple, Optional, NamedTuple, Iterator, Iterable
+from collections.abc import Sized
 import multiprocessing
+import threading
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure logging
 logging.basicConfig(
@@ -14,15 +17,177 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@dataclass
-class AudioFingerprint:
+try:
+    import pyfftw
+except ImportError:  # pragma: no cover - optional dependency
+    pyfftw = None
+
+class Fingerprints(NamedTuple):
+    """
+    Structure-of-arrays representation of a track's audio fingerprints
+    
+    The i-th fingerprint is (hash_value[i], time_offset[i], freq1[i], freq2[i]).
+    """
+    hash_value: np.ndarray   # uint32
+    time_offset: np.ndarray  # int32
+    freq1: np.ndarray        # int16
+    freq2: np.ndarray        # int16
+    track_id: Optional[str] = None
+    
+    @classmethod
+    def empty(cls, track_id: Optional[str] = None) -> 'Fingerprints':
+        """
+        Create a collection holding no fingerprints
+        
+        Args:
+            track_id: Optional track identifier
+        
+        Returns:
+            Empty fingerprints
+        """
+        return cls(
+            hash_value=np.empty(0, dtype=np.uint32),
+            time_offset=np.empty(0, dtype=np.int32),
+            freq1=np.empty(0, dtype=np.int16),
+            freq2=np.empty(0, dtype=np.int16),
+            track_id=track_id
+        )
+
+@njit(cache=True, nogil=True, fastmath=True)
+def _find_peaks_nb(
+    frames: np.ndarray, 
+    max_peaks: int, 
+    thresh: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Find the strongest local maxima of every spectrogram frame
+    
+    Args:
+        frames: Log-scaled spectrogram laid out as (time, frequency)
+        max_peaks: Maximum number of peaks kept per frame
+        thresh: Minimum magnitude of a peak
+    
+    Returns:
+        (time_index, frequency_index, magnitude) arrays, ordered by time
+        and then by frequency
+    """
+    n_frames, n_freqs = frames.shape
+    capacity = n_frames * min(max_peaks, n_freqs)
+    
+    t_idx = np.empty(capacity, dtype=np.int32)
+    f_idx = np.empty(capacity, dtype=np.int32)
+    mag = np.empty(capacity, dtype=np.float32)
+    
+    cand_f = np.empty(n_freqs, dtype=np.int32)
+    cand_mag = np.empty(n_freqs, dtype=np.float32)
+    
+    n = 0
+    for t in range(n_frames):
+        frame = frames[t]
+        
+        # Local maxima over an 11-bin frequency neighborhood
+        n_cand = 0
+        for f in range(n_freqs):
+            value = frame[f]
+            if value <= thresh:
+                continue
+            
+            is_peak = True
+            for k in range(max(0, f - 5), min(n_freqs, f + 6)):
+                if frame[k] > value:
+                    is_peak = False
+                    break
+            
+            if is_peak:
+                cand_f[n_cand] = f
+                cand_mag[n_cand] = value
+                n_cand += 1
+        
+        # Keep the strongest peaks: an O(F) partition finds the magnitude of
+        # the max_peaks-th strongest candidate, ties go to lower frequencies
+        kth = -np.inf
+        n_ties = 0
+        if n_cand > max_peaks:
+            kth = -np.partition(-cand_mag[:n_cand], max_peaks - 1)[max_peaks - 1]
+            n_ties = max_peaks
+            for i in range(n_cand):
+                if cand_mag[i] > kth:
+                    n_ties -= 1
+        
+        for i in range(n_cand):
+            value = cand_mag[i]
+            if value < kth:
+                continue
+            if value == kth:
+                if n_ties == 0:
+                    continue
+                n_ties -= 1
+            
+            t_idx[n] = t
+            f_idx[n] = cand_f[i]
+            mag[n] = value
+            n += 1
+    
+    return t_idx[:n], f_idx[:n], mag[:n]
+
+def _pair_features(
+    t_idx: np.ndarray, 
+    f_idx: np.ndarray, 
+    fan_out: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pair every anchor peak with the next fan_out peaks
+    
+    Args:
+        t_idx: Peak time indices
+        f_idx: Peak frequency indices
+        fan_out: Number of target points to pair with anchor
+    
+    Returns:
+        (anchor_frequency, target_frequency, time_delta, anchor_time) arrays,
+        ordered by anchor and then by target
+    """
+    n = len(t_idx)
+    
+    anchor = np.repeat(np.arange(n), fan_out)
+    target = anchor + np.tile(np.arange(1, fan_out + 1), n)
+    
+    valid = target < n
+    anchor, target = anchor[valid], target[valid]
+    
+    return (
+        f_idx[anchor], 
+        f_idx[target], 
+        t_idx[target] - t_idx[anchor], 
+        t_idx[anchor]
+    )
+
+def _hash32(
+    f1: np.ndarray, 
+    f2: np.ndarray, 
+    dt: np.ndarray, 
+    freq_bits: int = 10
+) -> np.ndarray:
     """
-    Structured representation of an audio fingerprint
+    Pack peak-pair features into 32-bit hashes (freq_bits|freq_bits|rest)
+    
+    Args:
+        f1: Anchor frequency indices
+        f2: Target frequency indices
+        dt: Time deltas between anchor and target
+        freq_bits: Width of each frequency field; must hold every bin index
+    
+    Returns:
+        Array of uint32 hash values
     """
-    hash_value: int
-    track_id: str
-    time_offset: int
-    frequency_pair: Tuple[int, int]
+    dt_bits = 32 - 2 * freq_bits
+    f_mask = (1 << freq_bits) - 1
+    
+    f1 = f1.astype(np.uint32) & f_mask
+    f2 = f2.astype(np.uint32) & f_mask
+    dt = dt.astype(np.uint32) & ((1 << dt_bits) - 1)
+    
+    return (f1 << (freq_bits + dt_bits)) | (f2 << dt_bits) | dt
 
 class RobustAudioFingerprinter:
     """
@@ -49,27 +214,85 @@ class RobustAudioFingerprinter:
         self.hop_length = hop_length
         self.max_peaks = max_peaks
         
-    def preprocess_audio(self, audio: np.ndarray) -> np.ndarray:
+        # Frequency fields wide enough for every bin 0..n_fft // 2, so the
+        # top bin does not alias onto bin 0 (11 bits for n_fft=2048)
+        self._freq_bits = (n_fft // 2).bit_length()
+        
+        # Periodic Hann window and STFT buffers, reused for every track
+        self._window = np.hanning(n_fft + 1)[:-1].astype(np.float32)
+        self._fft_block = 256  # Frames transformed per FFT call
+        
+        # Buffers are per thread so segments can be transformed concurrently;
+        # build the constructing thread's set (and FFT plan) up front
+        self._local = threading.local()
+        self._stft_buffers()
+        
+    def _stft_buffers(self) -> Tuple[np.ndarray, np.ndarray, Optional[object]]:
+        """
+        Get the calling thread's STFT buffers, creating them on first use
+        
+        Returns:
+            (frame_block, spectrum_block, fftw_plan) with plan None without pyfftw
+        """
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is not None:
+            return buffers
+        
+        n_bins = self.n_fft // 2 + 1
+        if pyfftw is not None:
+            # Plan once for the fixed block shape
+            frames = pyfftw.empty_aligned((self._fft_block, self.n_fft), dtype=np.float32)
+            spectrum = pyfftw.empty_aligned((self._fft_block, n_bins), dtype=np.complex64)
+            fft = pyfftw.FFTW(frames, spectrum, axes=(1,), flags=('FFTW_MEASURE',))
+            frames[:] = 0  # Planning scribbles over the input
+        else:
+            frames = np.empty((self._fft_block, self.n_fft), dtype=np.float32)
+            spectrum = np.empty((self._fft_block, n_bins), dtype=np.complex64)
+            fft = None
+        
+        self._local.buffers = (frames, spectrum, fft)
+        return self._local.buffers
+    
+    def preprocess_audio(self, audio: np.ndarray, top_db: float = 60.0) -> np.ndarray:
         """
         Preprocess audio for robust fingerprinting
         
         Args:
-            audio: Raw audio time series
+            audio: Raw audio time series; left unmodified
+            top_db: Frames this far below the loudest frame count as silence
         
         Returns:
-            Preprocessed audio
+            Preprocessed float32 audio
         """
         # Resample if needed
         if len(audio) == 0:
             raise ValueError("Empty audio input")
         
-        # Normalize audio
-        audio = librosa.util.normalize(audio)
+        # Normalize into a new float32 buffer; the input may be read-only
+        # or still in use by the caller
+        peak = np.abs(audio).max()
+        audio = np.multiply(audio, 1.0 / peak if peak > 0 else 1.0, dtype=np.float32)
+        
+        # Trim silence using framewise energy
+        frame_length, hop_length = 2048, 512
+        if len(audio) < frame_length:
+            return audio
         
-        # Trim silence
-        audio, _ = librosa.effects.trim(audio)
+        frames = librosa.util.frame(
+            audio, 
+            frame_length=frame_length, 
+            hop_length=hop_length
+        )
+        energy = np.einsum('ij,ij->j', frames, frames)
         
-        return audio
+        non_silent = np.flatnonzero(energy > energy.max() * 10.0 ** (-top_db / 10.0))
+        if len(non_silent) == 0:
+            return audio
+        
+        start = non_silent[0] * hop_length
+        end = non_silent[-1] * hop_length + frame_length
+        
+        return audio[start:end]
     
     def generate_spectrogram(self, audio: np.ndarray) -> np.ndarray:
         """
@@ -81,17 +304,83 @@ class RobustAudioFingerprinter:
         Returns:
             Magnitude spectrogram
         """
-        # Compute multiple spectrogram representations
-        stft = np.abs(librosa.stft(
-            audio, 
-            n_fft=self.n_fft, 
-            hop_length=self.hop_length
-        ))
+        magnitude = self._stft_magnitude(self._frame(audio))
         
         # Apply log scaling for better peak detection
-        log_spectrogram = librosa.amplitude_to_db(stft, ref=np.max)
+        self._to_db(magnitude, ref=magnitude.max())
+        
+        # (frequency, time) view of the (time, frequency) buffer
+        return magnitude.T
+    
+    def _frame(self, audio: np.ndarray) -> np.ndarray:
+        """
+        Frame audio for the STFT
+        
+        Args:
+            audio: Preprocessed audio
         
-        return log_spectrogram
+        Returns:
+            (n_fft, n_frames) view of centered frames over zero-padded audio,
+            as librosa.stft uses (single precision throughout: the peak search
+            is bound by memory bandwidth)
+        """
+        padded = np.pad(audio.astype(np.float32, copy=False), self.n_fft // 2)
+        return librosa.util.frame(
+            padded, 
+            frame_length=self.n_fft, 
+            hop_length=self.hop_length
+        )
+    
+    def _stft_magnitude(self, frames: np.ndarray) -> np.ndarray:
+        """
+        Compute STFT magnitudes of framed audio
+        
+        Args:
+            frames: (n_fft, n_frames) frames from _frame
+        
+        Returns:
+            (n_frames, n_fft // 2 + 1) float32 magnitudes
+        """
+        frame_block, spectrum_block, fft = self._stft_buffers()
+        
+        n_frames = frames.shape[1]
+        magnitude = np.empty((n_frames, self.n_fft // 2 + 1), dtype=np.float32)
+        
+        # Window and transform block by block in the preallocated buffers
+        for start in range(0, n_frames, self._fft_block):
+            rows = min(self._fft_block, n_frames - start)
+            np.multiply(
+                frames[:, start:start + rows].T, 
+                self._window, 
+                out=frame_block[:rows]
+            )
+            
+            if fft is not None:
+                fft()
+            else:
+                spectrum_block[:rows] = np.fft.rfft(frame_block[:rows], axis=1)
+            
+            np.abs(spectrum_block[:rows], out=magnitude[start:start + rows])
+        
+        return magnitude
+    
+    @staticmethod
+    def _to_db(magnitude: np.ndarray, ref: float):
+        """
+        Convert magnitudes to decibels in place
+        
+        Equivalent to librosa.amplitude_to_db(S, ref=ref) when ref is the
+        maximum of S (values are clipped 80 dB below the reference).
+        
+        Args:
+            magnitude: Linear magnitudes, overwritten with decibels
+            ref: Reference magnitude mapped to 0 dB
+        """
+        np.maximum(magnitude, 1e-5, out=magnitude)
+        np.log10(magnitude, out=magnitude)
+        magnitude *= 20.0
+        magnitude -= 20.0 * np.log10(max(1e-5, ref))
+        np.maximum(magnitude, -80.0, out=magnitude)
     
     def find_peaks(self, spectrogram: np.ndarray) -> List[Tuple[int, int, float]]:
         """
@@ -103,37 +392,19 @@ class RobustAudioFingerprinter:
         Returns:
             List of (time_index, frequency_index, magnitude) peaks
         """
-        peaks = []
+        t_idx, f_idx, mag = _find_peaks_nb(
+            np.ascontiguousarray(spectrogram.T, dtype=np.float32), 
+            self.max_peaks, 
+            -40.0  # Threshold to ignore very low energy
+        )
         
-        # Detect local peaks across time-frequency plane
-        for t in range(spectrogram.shape[1]):
-            frame = spectrogram[:, t]
-            
-            # Find local maxima
-            local_peaks = []
-            for f in range(len(frame)):
-                # Check neighborhood
-                is_peak = True
-                neighborhood = frame[max(0, f-5):min(len(frame), f+6)]
-                
-                if len(neighborhood) > 0 and frame[f] != max(neighborhood):
-                    is_peak = False
-                
-                if is_peak and frame[f] > -40:  # Threshold to ignore very low energy
-                    local_peaks.append((f, frame[f]))
-            
-            # Sort and take top peaks
-            local_peaks.sort(key=lambda x: x[1], reverse=True)
-            for freq, mag in local_peaks[:self.max_peaks]:
-                peaks.append((t, freq, mag))
-        
-        return peaks
+        return list(zip(t_idx.tolist(), f_idx.tolist(), mag.tolist()))
     
     def generate_hashes(
         self, 
         peaks: List[Tuple[int, int, float]], 
         fan_out: int = 5
-    ) -> List[AudioFingerprint]:
+    ) -> Fingerprints:
         """
         Generate combinatorial hashes with improved entropy
         
@@ -142,38 +413,50 @@ class RobustAudioFingerprinter:
             fan_out: Number of target points to pair with anchor
         
         Returns:
-            List of audio fingerprints
+            Audio fingerprints
         """
-        fingerprints = []
+        if not peaks:
+            return Fingerprints.empty()
         
-        for i, anchor in enumerate(peaks):
-            for j in range(i + 1, min(i + fan_out + 1, len(peaks))):
-                target = peaks[j]
-                
-                # Calculate features
-                freq1, freq2 = anchor[1], target[1]
-                time_diff = target[0] - anchor[0]
-                
-                # Generate hash
-                hash_input = f"{freq1}|{freq2}|{time_diff}"
-                hash_value = int(hashlib.sha256(hash_input.encode()).hexdigest(), 16) % (2**32)
-                
-                fingerprint = AudioFingerprint(
-                    hash_value=hash_value,
-                    track_id=None,  # To be set during database creation
-                    time_offset=anchor[0],
-                    frequency_pair=(freq1, freq2)
-                )
-                
-                fingerprints.append(fingerprint)
+        peak_array = np.asarray(peaks, dtype=np.float64)
+        
+        return self._hash_peaks(
+            peak_array[:, 0].astype(np.int32), 
+            peak_array[:, 1].astype(np.int32), 
+            fan_out
+        )
+    
+    def _hash_peaks(
+        self, 
+        t_idx: np.ndarray, 
+        f_idx: np.ndarray, 
+        fan_out: int = 5
+    ) -> Fingerprints:
+        """
+        Generate combinatorial hashes from peak index arrays
         
-        return fingerprints
+        Args:
+            t_idx: Peak time indices
+            f_idx: Peak frequency indices
+            fan_out: Number of target points to pair with anchor
+        
+        Returns:
+            Audio fingerprints
+        """
+        f1, f2, dt, t_anchor = _pair_features(t_idx, f_idx, fan_out)
+        
+        return Fingerprints(
+            hash_value=_hash32(f1, f2, dt, self._freq_bits),
+            time_offset=t_anchor,
+            freq1=f1.astype(np.int16),
+            freq2=f2.astype(np.int16)
+        )
     
     def fingerprint_audio(
         self, 
         audio: np.ndarray, 
         track_id: Optional[str] = None
-    ) -> List[AudioFingerprint]:
+    ) -> Fingerprints:
         """
         Generate complete audio fingerprint
         
@@ -182,7 +465,7 @@ class RobustAudioFingerprinter:
             track_id: Optional track identifier
         
         Returns:
-            List of audio fingerprints
+            Audio fingerprints
         """
         try:
             # Preprocess
@@ -194,68 +477,311 @@ class RobustAudioFingerprinter:
             # Find peaks
             peaks = self.find_peaks(spectrogram)
             
-            # Generate hashes
-            fingerprints = self.generate_hashes(peaks)
+            # Generate hashes and set track ID if provided
+            return self.generate_hashes(peaks)._replace(track_id=track_id)
+        
+        except Exception as e:
+            logger.error(f"Fingerprinting failed: {e}")
+            return Fingerprints.empty(track_id)
+    
+    def fingerprint_audio_parallel(
+        self, 
+        audio: np.ndarray, 
+        track_id: Optional[str] = None, 
+        n_segments: Optional[int] = None
+    ) -> Fingerprints:
+        """
+        Generate complete audio fingerprint using threads within one file
+        
+        The frames are split into contiguous segments whose FFTs and peak
+        searches run concurrently (both release the GIL); the result is
+        identical to fingerprint_audio.
+        
+        Args:
+            audio: Audio time series
+            track_id: Optional track identifier
+            n_segments: Number of segments (defaults to the CPU count)
+        
+        Returns:
+            Audio fingerprints
+        """
+        try:
+            processed_audio = self.preprocess_audio(audio)
+            frames = self._frame(processed_audio)
+            
+            n_frames = frames.shape[1]
+            n_segments = max(1, min(n_segments or os.cpu_count() or 1, n_frames))
+            bounds = np.linspace(0, n_frames, n_segments + 1).astype(int)
             
-            # Set track ID if provided
-            for fp in fingerprints:
-                fp.track_id = track_id
+            def segment_peaks(magnitude, ref):
+                self._to_db(magnitude, ref)
+                return _find_peaks_nb(magnitude, self.max_peaks, -40.0)
             
-            return fingerprints
+            with ThreadPoolExecutor(max_workers=n_segments) as executor:
+                magnitudes = list(executor.map(
+                    lambda start, end: self._stft_magnitude(frames[:, start:end]), 
+                    bounds[:-1], 
+                    bounds[1:]
+                ))
+                
+                # Scale every segment against the loudest bin of the whole file
+                ref = max(magnitude.max() for magnitude in magnitudes)
+                peaks = list(executor.map(
+                    segment_peaks, 
+                    magnitudes, 
+                    [ref] * n_segments
+                ))
+            
+            t_idx = np.concatenate([
+                t + np.int32(start) for (t, _, _), start in zip(peaks, bounds[:-1])
+            ])
+            f_idx = np.concatenate([f for _, f, _ in peaks])
+            
+            return self._hash_peaks(t_idx, f_idx)._replace(track_id=track_id)
         
         except Exception as e:
             logger.error(f"Fingerprinting failed: {e}")
-            return []
+            return Fingerprints.empty(track_id)
+
+def load_audio(file_path: str, sample_rate: int = 16000) -> np.ndarray:
+    """
+    Load an audio file as mono float32 at the target sampling rate
+    
+    Files libsndfile can read that are already mono at the target rate
+    (WAV/FLAC/OGG) are read straight into a preallocated buffer; anything
+    else goes through librosa's decode and resample path.
+    
+    Args:
+        file_path: Path to audio file
+        sample_rate: Target sampling rate
+    
+    Returns:
+        Audio time series
+    """
+    try:
+        with sf.SoundFile(file_path) as sound_file:
+            if sound_file.samplerate == sample_rate and sound_file.channels == 1:
+                audio = np.empty(sound_file.frames, dtype=np.float32)
+                
+                # frames is only an estimate for some files; keep just what
+                # was actually read
+                return sound_file.read(out=audio)
+    except RuntimeError:
+        pass  # Format not supported by libsndfile
+    
+    audio, _ = librosa.load(file_path, sr=sample_rate)
+    return audio
+
+# Per-worker state, created once by _worker_init
+_FINGERPRINTER: Optional[RobustAudioFingerprinter] = None
+_WRITER_QUEUE = None
+
+def _worker_init(
+    fingerprinter_params: Optional[Dict[str, int]] = None, 
+    writer_queue=None
+):
+    """
+    Create the fingerprinter shared by every file a worker processes
+    
+    Args:
+        fingerprinter_params: Keyword arguments for RobustAudioFingerprinter
+        writer_queue: Optional queue receiving (track_id, fingerprints)
+    """
+    global _FINGERPRINTER, _WRITER_QUEUE
+    _FINGERPRINTER = RobustAudioFingerprinter(**(fingerprinter_params or {}))
+    _WRITER_QUEUE = writer_queue
+    
+    # Load JIT kernels and build FFT plans before the first real file
+    spectrogram = _FINGERPRINTER.generate_spectrogram(
+        np.zeros(_FINGERPRINTER.n_fft, dtype=np.float32)
+    )
+    _FINGERPRINTER.generate_hashes(_FINGERPRINTER.find_peaks(spectrogram))
+
+def _process_file(file_path: str) -> Optional[Tuple[str, Fingerprints]]:
+    """
+    Fingerprint a single audio file inside a worker process
+    
+    Args:
+        file_path: Path to audio file
+    
+    Returns:
+        (track_id, fingerprints), or None if the file could not be processed
+    """
+    try:
+        # Extract track ID from filename
+        track_id = os.path.splitext(os.path.basename(file_path))[0]
+        
+        # Load audio
+        audio = load_audio(file_path, sample_rate=_FINGERPRINTER.sample_rate)
+        
+        # Generate fingerprints
+        fingerprints = _FINGERPRINTER.fingerprint_audio(audio, track_id)
+        
+        return track_id, fingerprints
+    except Exception as e:
+        logger.error(f"Failed to process {file_path}: {e}")
+        return None
+
+def _queue_file(file_path: str) -> Optional[str]:
+    """
+    Fingerprint a single audio file and hand the result to the writer queue
+    
+    Args:
+        file_path: Path to audio file
+    
+    Returns:
+        Track ID, or None if the file could not be processed
+    """
+    result = _process_file(file_path)
+    if result is None:
+        return None
+    
+    _WRITER_QUEUE.put(result)
+    return result[0]
+
+def _chunksize(audio_files: Iterable[str], num_processes: int) -> int:
+    """
+    Pick an imap chunk size giving each worker about four chunks
+    
+    Args:
+        audio_files: Audio file paths (list or lazy iterable)
+        num_processes: Number of parallel processes
+    
+    Returns:
+        Chunk size (1 when the number of files is unknown)
+    """
+    if not isinstance(audio_files, Sized):
+        return 1
+    return max(1, len(audio_files) // (num_processes * 4))
+
+def iter_fingerprints(
+    audio_files: Iterable[str], 
+    num_processes: Optional[int] = None, 
+    fingerprinter_params: Optional[Dict[str, int]] = None
+) -> Iterator[Tuple[str, Fingerprints]]:
+    """
+    Parallel audio fingerprinting, yielding tracks as they complete
+    
+    Args:
+        audio_files: Audio file paths (list or lazy iterable)
+        num_processes: Number of parallel processes
+        fingerprinter_params: Keyword arguments for RobustAudioFingerprinter
+    
+    Yields:
+        (track_id, fingerprints) in completion order
+    """
+    if num_processes is None:
+        num_processes = max(1, multiprocessing.cpu_count() - 1)
+    
+    chunksize = _chunksize(audio_files, num_processes)
+    
+    with multiprocessing.Pool(
+        processes=num_processes, 
+        initializer=_worker_init, 
+        initargs=(fingerprinter_params,)
+    ) as pool:
+        for result in pool.imap_unordered(_process_file, audio_files, chunksize):
+            if result is not None:
+                yield result
 
 def parallel_fingerprint(
     audio_files: List[str], 
-    num_processes: Optional[int] = None
-) -> Dict[str, List[AudioFingerprint]]:
+    num_processes: Optional[int] = None, 
+    fingerprinter_params: Optional[Dict[str, int]] = None
+) -> Dict[str, Fingerprints]:
     """
     Parallel audio fingerprinting
     
     Args:
         audio_files: List of audio file paths
         num_processes: Number of parallel processes
+        fingerprinter_params: Keyword arguments for RobustAudioFingerprinter
     
     Returns:
         Dictionary of track fingerprints
     """
+    return dict(iter_fingerprints(audio_files, num_processes, fingerprinter_params))
+
+def fingerprint_to_database(
+    audio_files: Iterable[str], 
+    database, 
+    num_processes: Optional[int] = None, 
+    fingerprinter_params: Optional[Dict[str, int]] = None, 
+    commit_rows: int = 50000
+) -> List[str]:
+    """
+    Parallel audio fingerprinting streamed into a database
+    
+    Workers push each track's fingerprints onto a bounded queue that a
+    single writer thread drains into the database, so memory use does
+    not grow with the number of files and inserts overlap with FFTs.
+    
+    Args:
+        audio_files: Audio file paths (list or lazy iterable)
+        database: Database providing insert_fingerprints
+        num_processes: Number of parallel processes
+        fingerprinter_params: Keyword arguments for RobustAudioFingerprinter
+        commit_rows: Approximate number of fingerprint rows per transaction
+    
+    Returns:
+        IDs of the tracks stored in the database
+    """
     if num_processes is None:
         num_processes = max(1, multiprocessing.cpu_count() - 1)
     
-    def process_file(file_path):
-        try:
-            # Extract track ID from filename
-            track_id = os.path.splitext(os.path.basename(file_path))[0]
-            
-            # Load audio
-            audio, _ = librosa.load(file_path, sr=16000)
+    chunksize = _chunksize(audio_files, num_processes)
+    
+    with multiprocessing.Manager() as manager:
+        writer_queue = manager.Queue(maxsize=num_processes * 2)
+        stored = []
+        
+        def write_fingerprints():
+            pending, pending_rows = {}, 0
             
-            # Create fingerprinter
-            fingerprinter = RobustAudioFingerprinter()
+            def flush():
+                try:
+                    database.insert_fingerprints(pending)
+                    stored.extend(pending)
+                except Exception as e:
+                    # Keep draining so workers never block on a full queue
+                    logger.error(f"Failed to store {len(pending)} tracks: {e}")
+                pending.clear()
             
-            # Generate fingerprints
-            fingerprints = fingerprinter.fingerprint_audio(audio, track_id)
+            while True:
+                item = writer_queue.get()
+                if item is None:
+                    break
+                
+                # Group tracks into transactions of about commit_rows rows
+                track_id, fingerprints = item
+                pending[track_id] = fingerprints
+                pending_rows += len(fingerprints.hash_value)
+                
+                if pending_rows >= commit_rows:
+                    flush()
+                    pending_rows = 0
             
-            return track_id, fingerprints
-        except Exception as e:
-            logger.error(f"Failed to process {file_path}: {e}")
-            return None
-    
-    # Use multiprocessing
-    with multiprocessing.Pool(processes=num_processes) as pool:
-        results = pool.map(process_file, audio_files)
-    
-    # Filter out None results and convert to dictionary
-    fingerprint_dict = {
-        track_id: fingerprints 
-        for result in results 
-        if result is not None 
-        for track_id, fingerprints in [result]
-    }
-    
-    return fingerprint_dict
+            if pending:
+                flush()
+        
+        writer = threading.Thread(target=write_fingerprints, daemon=True)
+        writer.start()
+        
+        try:
+            with multiprocessing.Pool(
+                processes=num_processes, 
+                initializer=_worker_init, 
+                initargs=(fingerprinter_params, writer_queue)
+            ) as pool:
+                # Workers hand results to the writer; only the tracks it
+                # managed to commit are reported
+                for _ in pool.imap_unordered(_queue_file, audio_files, chunksize):
+                    pass
+        finally:
+            writer_queue.put(None)
+            writer.join()
+    
+    return stored
 
 def main():
     # Example usage
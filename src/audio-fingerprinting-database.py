@@ -1,46 +1,415 @@
 import sqlite3
+import itertools
+import pathlib
+import queue
+import threading
+import contextlib
+import functools
 import numpy as np
-from typing import List, Dict, Tuple
+import librosa
+from numba import njit
+from typing import List, Dict, Tuple, NamedTuple, Iterable
 import logging
-from dataclasses import asdict
 
-# Assuming previous AudioFingerprint and RobustAudioFingerprinter are imported
+from .core import Fingerprints, RobustAudioFingerprinter, parallel_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Rows per executemany handed to the writer thread
+WRITE_BATCH_ROWS = 10000
+
+# Histogram bins per track when scoring offset deltas; tracks whose deltas
+# span more frames than this are scored by sorting instead
+DELTA_BINS = 8192
+
+# Covering index: matching reads (track_int, time_offset) by hash_value
+# without visiting table rows; it also rejects duplicate fingerprints
+CREATE_FP_INDEX = '''
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_fp_hash 
+    ON fingerprints (hash_value, time_offset, track_int)
+'''
+
+# Columns the fingerprints table must have
+FINGERPRINT_COLUMNS = {'id', 'hash_value', 'track_int', 'time_offset'}
+
+# Temp table holding the sample being matched
+CREATE_SAMPLE_TABLE = '''
+    CREATE TEMP TABLE IF NOT EXISTS q (hash INTEGER, toff INTEGER)
+'''
+
+# Histogram of time-offset deltas per track over the (track_int, delta)
+# pairs produced by {pairs}; a true match lines up many hashes under a
+# single time shift, so confidence is the height of the histogram's peak
+# bin. Parameters: threshold, result limit.
+_RANK_SQL = '''
+    SELECT t.track_id, m.peak 
+    FROM (
+        SELECT track_int, MAX(c) AS peak 
+        FROM (
+            SELECT track_int, COUNT(*) AS c 
+            FROM ({pairs}) 
+            GROUP BY track_int, delta
+        ) 
+        GROUP BY track_int 
+        HAVING peak >= ? 
+        ORDER BY peak DESC 
+        LIMIT ?
+    ) m 
+    JOIN tracks t ON t.id = m.track_int 
+    ORDER BY m.peak DESC
+'''
+
+# Exact matching: pairs sharing the full hash
+MATCH_SQL = _RANK_SQL.format(pairs='''
+    SELECT f.track_int, f.time_offset - q.toff AS delta 
+    FROM q JOIN fingerprints f ON f.hash_value = q.hash
+''')
+
+# Approximate matching: pairs agreeing on at least one LSH band, each
+# counted once; CROSS JOIN pins the probe order q -> mask -> band index
+APPROX_MATCH_SQL = _RANK_SQL.format(pairs='''
+    SELECT f.track_int, f.time_offset - p.toff AS delta 
+    FROM (
+        SELECT DISTINCT q.rowid, q.toff, b.fp_rowid 
+        FROM q CROSS JOIN lsh_masks m 
+        CROSS JOIN lsh_bands b ON b.band_id = m.band_id 
+            AND b.band_hash = (q.hash & m.mask)
+    ) p 
+    JOIN fingerprints f ON f.id = p.fp_rowid
+''')
+
+# LSH band masks: 8 fixed 20-bit subsets of the 32-bit hash, together
+# covering every bit and each leaving out 12, so a hash corrupted in a few
+# bits still agrees with its clean version on some band. Stored in the
+# database; changing them requires rebuilding lsh_bands.
+LSH_MASKS = (
+    0xDFEE043F, 0xCCFCCCFA, 0xDF6D7274, 0xE33BE4EB, 
+    0xB3AE65BD, 0xCDB9EC6B, 0x72CF2FDA, 0xF52771F9
+)
+
+# Packed fingerprint record: 16 bytes per row
+FINGERPRINT_DTYPE = np.dtype([
+    ('h', '<i8'), ('t', '<i4'), ('f1', '<i2'), ('f2', '<i2')
+])
+
+class InvertedIndex(NamedTuple):
+    """
+    In-memory postings for the fingerprints table
+    
+    Postings are sorted by hash; the postings of hashes[i] occupy
+    bounds[i]:bounds[i + 1] in track and time_offset. Tracks are numbered
+    densely, track_ids[k] naming track k.
+    """
+    hashes: np.ndarray
+    bounds: np.ndarray
+    track: np.ndarray
+    time_offset: np.ndarray
+    track_ids: List[str]
+
+@njit(cache=True, nogil=True)
+def _peak_bins_nb(
+    tracks: np.ndarray, 
+    deltas: np.ndarray, 
+    n_tracks: int
+) -> np.ndarray:
+    """
+    Peak bin of every track's time-offset delta histogram
+    
+    Args:
+        tracks: Dense track number of each matching posting
+        deltas: Database minus sample time offset of each posting
+        n_tracks: Number of tracks
+    
+    Returns:
+        Peak bin count per track
+    """
+    n = len(tracks)
+    
+    # Counting sort of the deltas by track, so one histogram can be reused
+    # track after track instead of allocating n_tracks of them
+    starts = np.zeros(n_tracks + 1, dtype=np.int64)
+    for i in range(n):
+        starts[tracks[i] + 1] += 1
+    for k in range(n_tracks):
+        starts[k + 1] += starts[k]
+    
+    fill = starts[:-1].copy()
+    values = np.empty(n, dtype=np.int64)
+    for i in range(n):
+        k = tracks[i]
+        values[fill[k]] = deltas[i]
+        fill[k] += 1
+    
+    hist = np.zeros(DELTA_BINS, dtype=np.int32)
+    peaks = np.zeros(n_tracks, dtype=np.int32)
+    for k in range(n_tracks):
+        start, stop = starts[k], starts[k + 1]
+        if start == stop:
+            continue
+        track_values = values[start:stop]
+        low = track_values.min()
+        
+        # Deltas spanning more bins than the histogram holds are counted
+        # exactly by sorting rather than folded onto each other
+        if track_values.max() - low >= DELTA_BINS:
+            track_values = np.sort(track_values)
+            peak = run = 1
+            for j in range(1, stop - start):
+                run = run + 1 if track_values[j] == track_values[j - 1] else 1
+                peak = max(peak, run)
+            peaks[k] = peak
+            continue
+        
+        peak = 0
+        for j in range(start, stop):
+            b = values[j] - low
+            hist[b] += 1
+            peak = max(peak, hist[b])
+        peaks[k] = peak
+        
+        # Clear only the bins this track touched
+        for j in range(start, stop):
+            hist[values[j] - low] = 0
+    
+    return peaks
 
 class AudioFingerprintDatabase:
     """
     Robust database for storing and matching audio fingerprints
     """
-    def __init__(self, db_path: str = 'audio_fingerprints.db'):
+    def __init__(self, db_path: str = 'audio_fingerprints.db', lsh: bool = False):
         """
         Initialize SQLite database for fingerprints
         
         Args:
             db_path: Path to SQLite database
+            lsh: Maintain LSH bands for approximate matching; once created,
+                bands are kept up to date whenever the database is opened
         """
         self.db_path = db_path
-        self._create_tables()
+        
+        # One long-lived writer connection shared across threads behind a
+        # lock; matching and lookups borrow pooled read-only connections
+        self._conn = self._get_connection()
+        self._write_lock = threading.Lock()
+        self._readers = queue.Queue()
+        
+        # Optional in-memory copy of the fingerprints table, see load_index
+        self._index = None
+        
+        # Bumped under the write lock after every committed write, so
+        # readers can tell whether what they read may already be stale
+        self._generation = 0
+        
+        # A dedicated thread executes insert batches while the caller
+        # builds the next one
+        self._write_q = queue.Queue(maxsize=16)
+        self._write_error = None
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+        
+        # Match results look up the same tracks again and again; entries
+        # are keyed by write generation, so a row read while a write
+        # commits is never served after it
+        self._metadata_cache = functools.lru_cache(maxsize=4096)(
+            self._load_track_metadata
+        )
+        
+        try:
+            self._create_tables(lsh)
+        except Exception:
+            self.close()
+            raise
+    
+    def _get_connection(self, readonly: bool = False) -> sqlite3.Connection:
+        """
+        Open a connection tuned for fingerprint workloads
+        
+        Connections run in autocommit mode; multi-statement writes open
+        their own transaction with BEGIN.
+        
+        Args:
+            readonly: Open the database in read-only mode
+        
+        Returns:
+            SQLite connection
+        """
+        if readonly:
+            uri = pathlib.Path(self.db_path).resolve().as_uri() + '?mode=ro'
+            conn = sqlite3.connect(
+                uri, uri=True, isolation_level=None, check_same_thread=False, 
+                cached_statements=256
+            )
+        else:
+            conn = sqlite3.connect(
+                self.db_path, isolation_level=None, check_same_thread=False, 
+                cached_statements=256
+            )
+            
+            # WAL lets readers run alongside the ingest writer and groups
+            # commits; the mode is persistent, so readers inherit it
+            conn.executescript('''
+                PRAGMA journal_mode=WAL;
+                PRAGMA synchronous=NORMAL;
+            ''')
+        
+        # The page cache and memory map keep matching off the read syscalls
+        conn.executescript('''
+            PRAGMA temp_store=MEMORY;
+            PRAGMA mmap_size=268435456;
+            PRAGMA cache_size=-65536;
+        ''')
+        
+        return conn
+    
+    @contextlib.contextmanager
+    def _reader(self):
+        """Borrow a read-only connection from the pool, opening one if empty"""
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = self._get_connection(readonly=True)
+        
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
     
-    def _create_tables(self):
-        """Create necessary database tables"""
-        with sqlite3.connect(self.db_path) as conn:
+    def _write_loop(self):
+        """Stage queued fingerprint batches on the writer connection"""
+        cursor = self._conn.cursor()
+        
+        while True:
+            batch = self._write_q.get()
+            if batch is None:
+                self._write_q.task_done()
+                break
+            
+            # After a failure, drain the rest of the call without executing
+            try:
+                if self._write_error is None:
+                    cursor.executemany(
+                        'INSERT INTO staging_fp VALUES (?, ?, ?)', batch
+                    )
+            except Exception as e:
+                self._write_error = e
+            finally:
+                self._write_q.task_done()
+    
+    def __enter__(self) -> 'AudioFingerprintDatabase':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def close(self):
+        """
+        Stop the writer thread and close all connections
+        
+        The writer thread keeps the instance alive, so every database must
+        be closed, directly or by using it as a context manager.
+        """
+        if not self._writer.is_alive():
+            return
+        
+        self._write_q.put(None)
+        self._writer.join()
+        
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+        
+        self._conn.close()
+    
+    def _create_tables(self, lsh: bool = False):
+        """
+        Create necessary database tables
+        
+        Args:
+            lsh: Also create the LSH band tables
+        """
+        with self._write_lock, self._conn as conn:
             cursor = conn.cursor()
             
-            # Fingerprint table
+            # Everything below, including an LSH backfill, commits at once
+            cursor.execute('BEGIN')
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'lsh_bands'"
+            )
+            had_lsh = cursor.fetchone() is not None
+            
+            # Databases from before the integer track ids and the id
+            # primary key cannot be migrated in place
+            cursor.execute('PRAGMA table_info(fingerprints)')
+            columns = {row[1] for row in cursor.fetchall()}
+            if columns and not FINGERPRINT_COLUMNS <= columns:
+                raise ValueError(
+                    f"Database schema of {self.db_path} is outdated, "
+                    "rebuild it by fingerprinting the tracks again"
+                )
+            
+            # Fingerprint table; the frequency pair is already packed into
+            # hash_value (see core._hash32), so only the time offset is kept
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS fingerprints (
+                    id INTEGER PRIMARY KEY,
                     hash_value INTEGER,
-                    track_id TEXT,
-                    time_offset INTEGER,
-                    freq1 INTEGER,
-                    freq2 INTEGER,
-                    PRIMARY KEY (hash_value, track_id, time_offset)
+                    track_int INTEGER REFERENCES tracks(id),
+                    time_offset INTEGER
+                )
+            ''')
+            
+            cursor.execute(CREATE_FP_INDEX)
+            
+            # LSH bands: each fingerprint's hash under every band mask
+            if lsh:
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS lsh_masks (
+                        band_id INTEGER PRIMARY KEY,
+                        mask INTEGER
+                    )
+                ''')
+                cursor.executemany(
+                    'INSERT OR IGNORE INTO lsh_masks VALUES (?, ?)', 
+                    enumerate(LSH_MASKS)
+                )
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS lsh_bands (
+                        band_id INTEGER,
+                        band_hash INTEGER,
+                        fp_rowid INTEGER REFERENCES fingerprints(id)
+                    )
+                ''')
+                
+                # Band fingerprints stored before LSH was enabled
+                if not had_lsh:
+                    cursor.execute('''
+                        INSERT INTO lsh_bands (band_id, band_hash, fp_rowid) 
+                        SELECT m.band_id, f.hash_value & m.mask, f.id 
+                        FROM fingerprints f, lsh_masks m
+                    ''')
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_lsh_band 
+                    ON lsh_bands (band_id, band_hash, fp_rowid)
+                ''')
+            
+            self._lsh = had_lsh or lsh
+            
+            # Unindexed per-connection landing table for insert batches
+            cursor.execute('''
+                CREATE TEMP TABLE IF NOT EXISTS staging_fp (
+                    hash INTEGER, tid INTEGER, t INTEGER
                 )
             ''')
             
-            # Metadata table
+            # Metadata table; fingerprints reference the integer id so
+            # their rows stay fixed-width
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS tracks (
-                    track_id TEXT PRIMARY KEY,
+                    id INTEGER PRIMARY KEY,
+                    track_id TEXT UNIQUE NOT NULL,
                     filename TEXT,
                     artist TEXT,
                     album TEXT,
@@ -52,32 +421,179 @@ class AudioFingerprintDatabase:
     
     def insert_fingerprints(
         self, 
-        fingerprints_dict: Dict[str, List[AudioFingerprint]]
+        fingerprints_dict: Dict[str, Fingerprints]
     ):
         """
-        Insert fingerprints for multiple tracks
+        Insert fingerprints for multiple tracks in a single transaction
         
         Args:
             fingerprints_dict: Dictionary of track fingerprints
         """
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            for track_id, fingerprints in fingerprints_dict.items():
-                for fp in fingerprints:
+        self._insert(fingerprints_dict, bulk=False)
+    
+    def bulk_load(self, fingerprints_dict: Dict[str, Fingerprints]):
+        """
+        Insert a large batch of fingerprints, rebuilding the index afterwards
+        
+        Building the hash index with one sort beats maintaining it row by
+        row when the batch is large relative to the table, as when first
+        loading a library.
+        
+        Args:
+            fingerprints_dict: Dictionary of track fingerprints
+        """
+        self._insert(fingerprints_dict, bulk=True)
+    
+    def _insert(self, fingerprints_dict: Dict[str, Fingerprints], bulk: bool):
+        """
+        Insert fingerprints for multiple tracks in a single transaction
+        
+        Args:
+            fingerprints_dict: Dictionary of track fingerprints
+            bulk: Drop the hash index during the insert and rebuild it
+        """
+        with self._write_lock:
+            with self._conn as conn:
+                cursor = conn.cursor()
+                cursor.execute('BEGIN')
+                
+                # Staging must start empty; anything left there belongs to
+                # no transaction of ours
+                cursor.execute('DELETE FROM staging_fp')
+                
+                track_ints = {
+                    track_id: self._track_int(cursor, track_id) 
+                    for track_id in fingerprints_dict
+                }
+                
+                # One flat row stream across all tracks, cut into batches
+                # for the writer thread
+                rows = itertools.chain.from_iterable(
+                    zip(
+                        fingerprints.hash_value.tolist(), 
+                        itertools.repeat(track_ints[track_id]), 
+                        fingerprints.time_offset.tolist()
+                    )
+                    for track_id, fingerprints in fingerprints_dict.items()
+                )
+                
+                self._write_error = None
+                try:
+                    for batch in iter(
+                        lambda: list(itertools.islice(rows, WRITE_BATCH_ROWS)), []
+                    ):
+                        self._write_q.put(batch)
+                except Exception as e:
+                    # Have the writer skip what is still queued
+                    self._write_error = e
+                    raise
+                finally:
+                    # Never roll back or commit while the writer still uses
+                    # the connection; a failed batch rolls back the whole
+                    # transaction
+                    self._write_q.join()
+                
+                if self._write_error is not None:
+                    raise self._write_error
+                
+                cursor.execute('SELECT COALESCE(MAX(id), 0) FROM fingerprints')
+                last_id = cursor.fetchone()[0]
+                
+                if bulk:
+                    self._merge_staged_bulk(cursor)
+                else:
+                    # Feed the index in key order instead of probing it at a
+                    # random position per row; the unique index drops
+                    # duplicates
                     cursor.execute('''
                         INSERT OR IGNORE INTO fingerprints 
-                        (hash_value, track_id, time_offset, freq1, freq2) 
-                        VALUES (?, ?, ?, ?, ?)
-                    ''', (
-                        fp.hash_value, 
-                        track_id, 
-                        fp.time_offset, 
-                        fp.frequency_pair[0], 
-                        fp.frequency_pair[1]
-                    ))
+                        (hash_value, track_int, time_offset) 
+                        SELECT hash, tid, t FROM staging_fp 
+                        ORDER BY hash, t, tid
+                    ''')
+                cursor.execute('DELETE FROM staging_fp')
+                
+                # Band the rows this call added
+                if self._lsh:
+                    cursor.execute('''
+                        INSERT INTO lsh_bands (band_id, band_hash, fp_rowid) 
+                        SELECT m.band_id, f.hash_value & m.mask, f.id 
+                        FROM fingerprints f, lsh_masks m 
+                        WHERE f.id > ?
+                    ''', (last_id,))
             
-            conn.commit()
+            # Refresh planner statistics: fully after a bulk load, otherwise
+            # only once the table has grown enough
+            conn.execute('ANALYZE' if bulk else 'PRAGMA optimize')
+            
+            # The in-memory index no longer reflects the table
+            self._generation += 1
+            self._index = None
+        
+        # New tracks rows may replace cached misses
+        self._metadata_cache.cache_clear()
+    
+    @staticmethod
+    def _merge_staged_bulk(cursor: sqlite3.Cursor):
+        """
+        Move staged rows into fingerprints without index maintenance
+        
+        Args:
+            cursor: Cursor inside the caller's write transaction
+        """
+        cursor.execute('DROP INDEX IF EXISTS idx_fp_hash')
+        
+        cursor.execute('''
+            INSERT INTO fingerprints 
+            (hash_value, track_int, time_offset) 
+            SELECT hash, tid, t FROM staging_fp
+        ''')
+        
+        try:
+            cursor.execute(CREATE_FP_INDEX)
+        except sqlite3.IntegrityError:
+            # Nothing enforced uniqueness during the insert; keep the oldest
+            # copy of every duplicate and retry
+            cursor.execute('''
+                DELETE FROM fingerprints WHERE id NOT IN (
+                    SELECT MIN(id) FROM fingerprints 
+                    GROUP BY hash_value, time_offset, track_int
+                )
+            ''')
+            cursor.execute(CREATE_FP_INDEX)
+    
+    @staticmethod
+    def _track_int(cursor: sqlite3.Cursor, track_id: str) -> int:
+        """
+        Resolve a track's integer id, creating its tracks row if needed
+        
+        Args:
+            cursor: Cursor inside the caller's write transaction
+            track_id: Track identifier
+        
+        Returns:
+            Integer id referenced by the track's fingerprints
+        """
+        cursor.execute('''
+            INSERT INTO tracks (track_id) VALUES (?) 
+            ON CONFLICT (track_id) DO NOTHING
+        ''', (track_id,))
+        cursor.execute('SELECT id FROM tracks WHERE track_id = ?', (track_id,))
+        
+        return cursor.fetchone()[0]
+    
+    def insert_fingerprints_arr(self, track_id: str, arr: np.ndarray):
+        """
+        Insert one track's fingerprints from a structured array
+        
+        Args:
+            track_id: Track identifier
+            arr: Array of FINGERPRINT_DTYPE records
+        """
+        # Field access returns strided views, so no rows are copied
+        self.insert_fingerprints({
+            track_id: Fingerprints(arr['h'], arr['t'], arr['f1'], arr['f2'])
+        })
     
     def insert_track_metadata(
         self, 
@@ -97,69 +613,199 @@ class AudioFingerprintDatabase:
             album: Album name
             duration: Audio duration
         """
-        with sqlite3.connect(self.db_path) as conn:
+        self.insert_track_metadata_many(
+            [(track_id, filename, artist, album, duration)]
+        )
+    
+    def insert_track_metadata_many(
+        self, 
+        rows: Iterable[Tuple[str, str, str, str, float]]
+    ):
+        """
+        Insert metadata for many tracks in a single transaction
+        
+        Args:
+            rows: (track_id, filename, artist, album, duration) tuples
+        """
+        with self._write_lock, self._conn as conn:
             cursor = conn.cursor()
+            cursor.execute('BEGIN')
             
-            cursor.execute('''
-                INSERT OR REPLACE INTO tracks 
+            # Upsert rather than REPLACE: a replaced row would get a new id
+            # and orphan the track's fingerprints
+            cursor.executemany('''
+                INSERT INTO tracks 
                 (track_id, filename, artist, album, duration) 
-                VALUES (?, ?, ?, ?, ?)
-            ''', (track_id, filename, artist, album, duration))
-            
+                VALUES (?, ?, ?, ?, ?) 
+                ON CONFLICT (track_id) DO UPDATE SET 
+                    filename = excluded.filename, 
+                    artist = excluded.artist, 
+                    album = excluded.album, 
+                    duration = excluded.duration
+            ''', rows)
             conn.commit()
+            
+            self._generation += 1
+        
+        self._metadata_cache.cache_clear()
     
     def match_fingerprint(
         self, 
-        sample_fingerprints: List[AudioFingerprint], 
-        threshold: int = 5
-    ) -> List[Tuple[str, float]]:
+        sample_fingerprints: Fingerprints, 
+        threshold: int = 5, 
+        max_results: int = None, 
+        approximate: bool = False
+    ) -> List[Tuple[str, int]]:
         """
         Match sample fingerprints against database
         
         Args:
             sample_fingerprints: Fingerprints to match
-            threshold: Minimum number of matching hashes
+            threshold: Minimum number of time-aligned matching hashes
+            max_results: Maximum number of matches to return (all if None)
+            approximate: Also pair hashes that agree on any LSH band, for
+                noisy samples; requires a database created with lsh=True
         
         Returns:
-            List of (track_id, confidence) sorted by confidence
+            List of (track_id, confidence) sorted by confidence, where 
+            confidence is the number of hashes agreeing on one time offset
+        """
+        if approximate and not self._lsh:
+            raise ValueError("Approximate matching requires LSH bands (lsh=True)")
+        
+        if self._index is not None and not approximate:
+            return self._match_index(sample_fingerprints, threshold, max_results)
+        
+        with self._reader() as conn:
+            cursor = conn.cursor()
+            
+            # Load the sample into a temp table and resolve every hash in
+            # one join instead of one query per fingerprint
+            cursor.execute(CREATE_SAMPLE_TABLE)
+            cursor.execute('DELETE FROM q')
+            cursor.executemany('INSERT INTO q VALUES (?, ?)', zip(
+                sample_fingerprints.hash_value.tolist(), 
+                sample_fingerprints.time_offset.tolist()
+            ))
+            
+            cursor.execute(
+                APPROX_MATCH_SQL if approximate else MATCH_SQL, 
+                (threshold, -1 if max_results is None else max_results)
+            )
+            
+            return cursor.fetchall()
+    
+    def load_index(self) -> InvertedIndex:
         """
-        # Group matches by track
-        track_matches = {}
+        Load the fingerprints table into an in-memory inverted index
+        
+        While loaded, match_fingerprint probes the index instead of
+        querying SQLite. Inserting fingerprints drops it again.
         
-        with sqlite3.connect(self.db_path) as conn:
+        Returns:
+            The loaded index
+        """
+        while True:
+            generation = self._generation
+            index = self._read_index()
+            
+            # Install only if no write committed since the snapshot was
+            # taken, otherwise read it again
+            with self._write_lock:
+                if self._generation == generation:
+                    self._index = index
+                    logger.info(f"Loaded {len(index.time_offset)} fingerprints into memory")
+                    return index
+    
+    def _read_index(self) -> InvertedIndex:
+        """Read the fingerprints table into an InvertedIndex"""
+        with self._reader() as conn:
             cursor = conn.cursor()
+            cursor.arraysize = 4096
             
-            for fp in sample_fingerprints:
+            # One read transaction, so the count sizes exactly what the scan
+            # returns even while the writer commits
+            cursor.execute('BEGIN')
+            with conn:
+                cursor.execute('SELECT COUNT(*) FROM fingerprints')
+                postings = np.empty((cursor.fetchone()[0], 3), dtype=np.int64)
+                
+                # Copy the scan into the preallocated buffer chunk by chunk
+                # rather than materializing a list of row tuples
                 cursor.execute('''
-                    SELECT track_id, time_offset 
-                    FROM fingerprints 
-                    WHERE hash_value = ?
-                ''', (fp.hash_value,))
+                    SELECT hash_value, track_int, time_offset 
+                    FROM fingerprints ORDER BY hash_value
+                ''')
+                n = 0
+                while rows := cursor.fetchmany():
+                    postings[n:n + len(rows)] = rows
+                    n += len(rows)
                 
-                for track_id, db_time_offset in cursor.fetchall():
-                    # Calculate time difference
-                    time_diff = abs(fp.time_offset - db_time_offset)
-                    
-                    if track_id not in track_matches:
-                        track_matches[track_id] = []
-                    
-                    track_matches[track_id].append(time_diff)
-        
-        # Calculate match confidence
-        match_results = []
-        for track_id, time_diffs in track_matches.items():
-            # Count consistent matches
-            unique_matches = len(set(time_diffs))
-            total_matches = len(time_diffs)
-            
-            # Calculate confidence
-            confidence = total_matches / max(1, unique_matches)
-            
-            if total_matches >= threshold:
-                match_results.append((track_id, confidence))
-        
-        # Sort by confidence
-        return sorted(match_results, key=lambda x: x[1], reverse=True)
+                cursor.execute('SELECT id, track_id FROM tracks')
+                track_names = dict(cursor.fetchall())
+        
+        # Postings arrive grouped by hash; each distinct hash owns the run
+        # starting at its first occurrence
+        hashes, starts = np.unique(postings[:, 0], return_index=True)
+        
+        # Renumber tracks densely so scoring can index arrays by track
+        track_ints, tracks = np.unique(postings[:, 1], return_inverse=True)
+        
+        return InvertedIndex(
+            hashes=hashes, 
+            bounds=np.append(starts, len(postings)), 
+            track=tracks.astype(np.int32), 
+            time_offset=postings[:, 2].astype(np.int32), 
+            track_ids=[track_names[track_int] for track_int in track_ints.tolist()]
+        )
+    
+    def _match_index(
+        self, 
+        sample_fingerprints: Fingerprints, 
+        threshold: int, 
+        max_results: int = None
+    ) -> List[Tuple[str, int]]:
+        """
+        Score a sample against the in-memory inverted index
+        
+        Args:
+            sample_fingerprints: Fingerprints to match
+            threshold: Minimum number of time-aligned matching hashes
+            max_results: Maximum number of matches to return (all if None)
+        
+        Returns:
+            List of (track_id, confidence) sorted by confidence
+        """
+        index = self._index
+        if not len(index.hashes):
+            return []
+        
+        sample_hashes = sample_fingerprints.hash_value.astype(np.int64)
+        
+        # Locate each sample hash's postings run; unknown hashes get none
+        pos = np.searchsorted(index.hashes, sample_hashes)
+        pos = np.minimum(pos, len(index.hashes) - 1)
+        found = index.hashes[pos] == sample_hashes
+        starts = index.bounds[pos][found]
+        lengths = index.bounds[pos + 1][found] - starts
+        
+        # Gather every matching posting with one fancy index
+        run_offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        postings = run_offsets + np.arange(lengths.sum())
+        deltas = (
+            index.time_offset[postings] - 
+            np.repeat(sample_fingerprints.time_offset[found], lengths)
+        )
+        
+        peaks = _peak_bins_nb(index.track[postings], deltas, len(index.track_ids))
+        
+        tracks = np.flatnonzero((peaks >= threshold) & (peaks > 0))
+        tracks = tracks[np.argsort(-peaks[tracks], kind='stable')][:max_results]
+        
+        return [
+            (index.track_ids[track], peak) 
+            for track, peak in zip(tracks.tolist(), peaks[tracks].tolist())
+        ]
     
     def get_track_metadata(self, track_id: str) -> Dict:
         """
@@ -171,51 +817,52 @@ class AudioFingerprintDatabase:
         Returns:
             Dictionary of track metadata
         """
-        with sqlite3.connect(self.db_path) as conn:
+        # Copy so callers cannot mutate the cached entry; the generation is
+        # read before the query runs
+        return dict(self._metadata_cache(track_id, self._generation))
+    
+    def _load_track_metadata(self, track_id: str, generation: int) -> Dict:
+        """Read one track's metadata row; memoized per instance in __init__"""
+        with self._reader() as conn:
+            # Name columns on this cursor only; matching keeps plain tuples
             cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
             
             cursor.execute('''
-                SELECT * FROM tracks WHERE track_id = ?
+                SELECT track_id, filename, artist, album, duration 
+                FROM tracks WHERE track_id = ?
             ''', (track_id,))
             
-            columns = [
-                'track_id', 'filename', 'artist', 
-                'album', 'duration'
-            ]
-            
             result = cursor.fetchone()
-            return dict(zip(columns, result)) if result else {}
+            return dict(result) if result else {}
 
 def main():
     # Example workflow
     fingerprinter = RobustAudioFingerprinter()
-    database = AudioFingerprintDatabase()
-    
-    # Parallel fingerprinting
-    audio_files = ['track1.mp3', 'track2.wav']
-    fingerprints = parallel_fingerprint(audio_files)
-    
-    # Insert fingerprints
-    database.insert_fingerprints(fingerprints)
-    
-    # Add metadata
-    for track_id in fingerprints.keys():
-        database.insert_track_metadata(
-            track_id=track_id,
-            filename=f"{track_id}.mp3",
-            artist=f"Artist {track_id}",
-            album=f"Album {track_id}"
-        )
-    
-    # Match sample
-    sample_audio, _ = librosa.load('sample.mp3', sr=16000)
-    sample_fingerprints = fingerprinter.fingerprint_audio(sample_audio)
-    
-    matches = database.match_fingerprint(sample_fingerprints)
     
-    for track_id, confidence in matches:
-        metadata = database.get_track_metadata(track_id)
-        print(f"Match: {metadata['artist']} - Confidence: {confidence}")
+    with AudioFingerprintDatabase() as database:
+        # Parallel fingerprinting
+        audio_files = ['track1.mp3', 'track2.wav']
+        fingerprints = parallel_fingerprint(audio_files)
+        
+        # Insert fingerprints
+        database.insert_fingerprints(fingerprints)
+        
+        # Add metadata
+        database.insert_track_metadata_many(
+            (track_id, f"{track_id}.mp3", f"Artist {track_id}", f"Album {track_id}", None)
+            for track_id in fingerprints.keys()
+        )
+        
+        # Match sample
+        sample_audio, _ = librosa.load('sample.mp3', sr=16000)
+        sample_fingerprints = fingerprinter.fingerprint_audio(sample_audio)
+        
+        matches = database.match_fingerprint(sample_fingerprints)
+        
+        for track_id, confidence in matches:
+            metadata = database.get_track_metadata(track_id)
+            print(f"Match: {metadata['artist']} - Confidence: {confidence}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
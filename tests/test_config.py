@@ -2,7 +2,8 @@ import pytest
 import os
 import tempfile
 import yaml
-from src.config import ConfigManager
+import dataclasses
+from src.config import ConfigManager, load_config
 
 class TestConfigManager:
     @pytest.fixture
@@ -35,11 +36,15 @@ class TestConfigManager:
         yield temp_file.name
         os.unlink(temp_file.name)
 
-    def test_singleton_instance(self):
-        # Verify that ConfigManager is a singleton
-        config1 = ConfigManager()
-        config2 = ConfigManager()
+    def test_load_config_cached(self):
+        # Verify that the frozen configuration is loaded once and shared
+        config1 = load_config()
+        config2 = load_config()
         assert config1 is config2
+        assert config1.sample_rate == ConfigManager().get('fingerprinting.sample_rate')
+        
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            config1.sample_rate = 8000
 
     def test_default_configuration(self):
         config = ConfigManager()
@@ -75,4 +80,17 @@ class TestConfigManager:
         
         # Test retrieving non-existent key with default
         value = config.get('non.existent.key', 'default_value')
-        assert value == 'default_value'
\ No newline at end of file
+        assert value == 'default_value'
+        
+        # The miss is cached, but every call still gets its own default
+        assert config.get('non.existent.key') is None
+        assert config.get('non.existent.key', 42) == 42
+
+    def test_cache_cleared_on_merge(self):
+        config = ConfigManager()
+        
+        assert config.get('matching.max_results') == 10
+        
+        # Merging new configuration must invalidate cached lookups
+        config._merge_configs({'matching': {'max_results': 20}})
+        assert config.get('matching.max_results') == 20
@@ -1,7 +1,8 @@
 import pytest
 import numpy as np
 import librosa
-from src.core import RobustAudioFingerprinter, parallel_fingerprint
+import soundfile as sf
+from src.core import RobustAudioFingerprinter, load_audio, parallel_fingerprint
 import os
 
 class TestRobustAudioFingerprinter:
@@ -19,6 +20,17 @@ class TestRobustAudioFingerprinter:
         assert np.max(np.abs(preprocessed)) <= 1.0  # Normalized
         assert len(preprocessed) < len(test_audio)  # Trimmed
 
+    def test_preprocess_audio_keeps_input(self, fingerprinter):
+        test_audio = np.random.randn(44100).astype(np.float32) * 4
+        test_audio.setflags(write=False)
+        original = test_audio.copy()
+        
+        preprocessed = fingerprinter.preprocess_audio(test_audio)
+        
+        assert preprocessed.dtype == np.float32
+        assert np.max(np.abs(preprocessed)) <= 1.0
+        np.testing.assert_array_equal(test_audio, original)
+
     def test_generate_spectrogram(self, fingerprinter):
         test_audio = np.random.randn(44100)
         preprocessed = fingerprinter.preprocess_audio(test_audio)
@@ -26,9 +38,22 @@ class TestRobustAudioFingerprinter:
         spectrogram = fingerprinter.generate_spectrogram(preprocessed)
         
         assert spectrogram.ndim == 2
+        assert spectrogram.dtype == np.float32
         assert spectrogram.shape[0] > 0
         assert spectrogram.shape[1] > 0
 
+    def test_spectrogram_matches_librosa(self, fingerprinter):
+        test_audio = np.random.randn(44100).astype(np.float32)
+        
+        spectrogram = fingerprinter.generate_spectrogram(test_audio)
+        expected = librosa.amplitude_to_db(
+            np.abs(librosa.stft(test_audio, n_fft=2048, hop_length=512)), 
+            ref=np.max
+        )
+        
+        assert spectrogram.shape == expected.shape
+        assert np.allclose(spectrogram, expected, atol=1e-2)
+
     def test_find_peaks(self, fingerprinter):
         test_audio = np.random.randn(44100)
         preprocessed = fingerprinter.preprocess_audio(test_audio)
@@ -47,16 +72,68 @@ class TestRobustAudioFingerprinter:
         
         fingerprints = fingerprinter.generate_hashes(peaks)
         
-        assert len(fingerprints) > 0
-        assert all(hasattr(fp, 'hash_value') for fp in fingerprints)
+        assert len(fingerprints.hash_value) > 0
+        assert fingerprints.hash_value.dtype == np.uint32
+        assert all(
+            len(column) == len(fingerprints.hash_value) 
+            for column in (fingerprints.time_offset, fingerprints.freq1, fingerprints.freq2)
+        )
+
+    def test_generate_hashes_top_bin(self, fingerprinter):
+        # Bin n_fft // 2 must not alias onto bin 0
+        top = fingerprinter.n_fft // 2
+        fingerprints = fingerprinter.generate_hashes([(0, top, 1.0), (1, 0, 1.0), (2, 0, 1.0)])
+        
+        assert len(set(fingerprints.hash_value.tolist())) == len(fingerprints.hash_value)
 
     def test_fingerprint_audio(self, fingerprinter):
         test_audio = np.random.randn(44100)
         
         fingerprints = fingerprinter.fingerprint_audio(test_audio, track_id='test_track')
         
-        assert len(fingerprints) > 0
-        assert all(fp.track_id == 'test_track' for fp in fingerprints)
+        assert len(fingerprints.hash_value) > 0
+        assert fingerprints.track_id == 'test_track'
+
+    def test_fingerprint_audio_parallel(self, fingerprinter):
+        test_audio = np.random.randn(44100)
+        
+        expected = fingerprinter.fingerprint_audio(test_audio.copy(), track_id='test_track')
+        fingerprints = fingerprinter.fingerprint_audio_parallel(
+            test_audio.copy(), track_id='test_track', n_segments=4
+        )
+        
+        assert fingerprints.track_id == 'test_track'
+        assert np.array_equal(fingerprints.hash_value, expected.hash_value)
+        assert np.array_equal(fingerprints.time_offset, expected.time_offset)
+
+def test_load_audio(tmp_path):
+    native_file = tmp_path / "native.wav"
+    resampled_file = tmp_path / "resampled.wav"
+    
+    sf.write(str(native_file), np.random.randn(16000) * 0.1, 16000)
+    sf.write(str(resampled_file), np.random.randn(22050) * 0.1, 22050)
+    
+    audio = load_audio(str(native_file), sample_rate=16000)
+    assert audio.dtype == np.float32
+    assert len(audio) == 16000
+    
+    audio = load_audio(str(resampled_file), sample_rate=16000)
+    assert len(audio) == 16000
+
+def test_load_audio_short_read(tmp_path, monkeypatch):
+    test_file = tmp_path / "short.wav"
+    samples = (np.random.randn(16000) * 0.1).astype(np.float32)
+    sf.write(str(test_file), samples, 16000, subtype='FLOAT')
+    
+    # Some formats only estimate their length and then read fewer frames
+    class EstimatingSoundFile(sf.SoundFile):
+        @property
+        def frames(self):
+            return super().frames + 1000
+    monkeypatch.setattr(sf, "SoundFile", EstimatingSoundFile)
+    
+    audio = load_audio(str(test_file), sample_rate=16000)
+    assert np.array_equal(audio, samples)
 
 def test_parallel_fingerprint(tmp_path):
     # Create some dummy audio files
@@ -75,5 +152,5 @@ def test_parallel_fingerprint(tmp_path):
     
     assert isinstance(fingerprints, dict)
     assert len(fingerprints) == len(test_files)
-    for track_id, fp_list in fingerprints.items():
-        assert len(fp_list) > 0
\ No newline at end of file
+    for track_id, track_fingerprints in fingerprints.items():
+        assert len(track_fingerprints.hash_value) > 0
\ No newline at end of file
@@ -1,16 +1,21 @@
 import pytest
 import os
+import contextlib
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import librosa
-from src.database import AudioFingerprintDatabase
-from src.core import RobustAudioFingerprinter
+import soundfile as sf
+from src.database import FINGERPRINT_DTYPE, AudioFingerprintDatabase
+from src.core import Fingerprints, RobustAudioFingerprinter, fingerprint_to_database
 
 class TestAudioFingerprintDatabase:
     @pytest.fixture
     def database(self, tmp_path):
         # Create a temporary database for testing
         db_path = tmp_path / "test_fingerprints.db"
-        return AudioFingerprintDatabase(str(db_path))
+        with AudioFingerprintDatabase(str(db_path)) as database:
+            yield database
 
     @pytest.fixture
     def fingerprinter(self):
@@ -37,10 +42,98 @@ class TestAudioFingerprintDatabase:
         # Verify insertion
         with database._get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM fingerprints WHERE track_id = ?", (track_id,))
+            cursor.execute(
+                "SELECT COUNT(*) FROM fingerprints JOIN tracks ON tracks.id = track_int "
+                "WHERE track_id = ?", (track_id,)
+            )
             count = cursor.fetchone()[0]
             assert count > 0
 
+    def test_insert_fingerprints_batches(self, database):
+        n = 25000
+        offsets = np.arange(n, dtype=np.int32)
+        freqs = np.zeros(n, dtype=np.int16)
+        database.insert_fingerprints({
+            "good": Fingerprints(offsets.astype(np.uint32), offsets, freqs, freqs)
+        })
+
+        # An unbindable value in the second batch rolls back the whole call
+        hashes = offsets.astype(object)
+        hashes[15000] = {}
+        with pytest.raises(Exception):
+            database.insert_fingerprints({
+                "bad": Fingerprints(hashes, offsets, freqs, freqs)
+            })
+
+        with database._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM fingerprints")
+            assert cursor.fetchone()[0] == n
+            cursor.execute("SELECT COUNT(*) FROM tracks WHERE track_id = 'bad'")
+            assert cursor.fetchone()[0] == 0
+
+    def test_insert_fingerprints_generator_failure(self, database):
+        n = 25000
+        offsets = np.arange(n, dtype=np.int32)
+        freqs = np.zeros(n, dtype=np.int16)
+        good = Fingerprints(offsets.astype(np.uint32), offsets, freqs, freqs)
+
+        # The row stream breaks on the second track, after batches of the
+        # first one are already queued
+        with pytest.raises(AttributeError):
+            database.insert_fingerprints({
+                "a": good, 
+                "b": Fingerprints(list(range(n)), offsets, freqs, freqs)
+            })
+
+        database.insert_fingerprints({"c": good._replace(hash_value=good.hash_value + n)})
+
+        with database._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*), MIN(hash_value) FROM fingerprints")
+            assert cursor.fetchone() == (n, n)
+            cursor.execute("SELECT track_id FROM tracks")
+            assert cursor.fetchall() == [("c",)]
+
+    def test_bulk_load(self, database):
+        rng = np.random.default_rng(0)
+        freqs = np.zeros(1000, dtype=np.int16)
+        fingerprints = {
+            f"track{i}": Fingerprints(
+                rng.integers(0, 2 ** 32, 1000, dtype=np.uint32), 
+                np.arange(1000, dtype=np.int32), freqs, freqs
+            )
+            for i in range(3)
+        }
+        database.bulk_load(fingerprints)
+
+        # Reloading a track adds no duplicates and restores the index
+        database.bulk_load({"track1": fingerprints["track1"]})
+
+        with database._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM fingerprints")
+            assert cursor.fetchone()[0] == 3000
+            cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'idx_fp_hash'")
+            assert cursor.fetchone()[0] == 1
+        assert database.match_fingerprint(fingerprints["track2"])[0] == ("track2", 1000)
+
+    def test_insert_fingerprints_arr(self, database):
+        arr = np.zeros(100, dtype=FINGERPRINT_DTYPE)
+        arr['h'] = np.arange(100) * 7919
+        arr['t'] = np.arange(100)
+        arr['f1'], arr['f2'] = 10, 20
+
+        database.insert_fingerprints_arr("test_track", arr)
+
+        with database._get_connection() as conn:
+            rows = conn.execute(
+                "SELECT hash_value, time_offset FROM fingerprints "
+                "JOIN tracks ON tracks.id = track_int "
+                "WHERE track_id = ? ORDER BY time_offset", ("test_track",)
+            ).fetchall()
+        assert rows == list(zip(arr['h'].tolist(), arr['t'].tolist()))
+
     def test_insert_track_metadata(self, database):
         track_id = "test_track"
         filename = "test.mp3"
@@ -60,6 +153,57 @@ class TestAudioFingerprintDatabase:
         assert metadata['album'] == album
         assert metadata['duration'] == duration
 
+    def test_insert_track_metadata_many(self, database):
+        database.insert_track_metadata_many(
+            (f"track{i}", f"track{i}.mp3", "Test Artist", None, 60.0 + i) 
+            for i in range(3)
+        )
+
+        assert database.get_track_metadata("track2")['duration'] == 62.0
+        assert database.get_track_metadata("track0")['filename'] == "track0.mp3"
+
+    def test_track_metadata_cache(self, database):
+        assert database.get_track_metadata("test_track") == {}
+
+        # Inserting clears the cached miss; later reads skip sqlite
+        database.insert_track_metadata("test_track", "test.mp3")
+        assert database.get_track_metadata("test_track")['filename'] == "test.mp3"
+        database.get_track_metadata("test_track")['filename'] = "changed.mp3"
+        assert database.get_track_metadata("test_track")['filename'] == "test.mp3"
+        assert database._metadata_cache.cache_info().hits == 2
+
+    def test_track_metadata_cache_concurrent_write(self, database, monkeypatch):
+        database.insert_track_metadata("test_track", "old.mp3")
+
+        # Another thread commits after the lookup read the old row but
+        # before the cache stored it
+        reader, written = database._reader, []
+        @contextlib.contextmanager
+        def read_then_write():
+            with reader() as conn:
+                yield conn
+            if not written:
+                written.append(True)
+                database.insert_track_metadata("test_track", "new.mp3")
+        monkeypatch.setattr(database, "_reader", read_then_write)
+
+        assert database.get_track_metadata("test_track")['filename'] == "old.mp3"
+        assert database.get_track_metadata("test_track")['filename'] == "new.mp3"
+
+    def test_concurrent_readers(self, database):
+        database.insert_track_metadata("test_track", "old.mp3")
+        database.insert_track_metadata("test_track", "new.mp3")
+
+        # Pooled read-only connections see the writer's committed rows
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(
+                lambda _: database.get_track_metadata("test_track"), range(50)
+            ))
+
+        assert all(result['filename'] == "new.mp3" for result in results)
+        assert database._readers.qsize() <= 4
+        database.close()
+
     def test_match_fingerprint(self, database, fingerprinter, tmp_path):
         # Create test tracks
         test_files = [
@@ -88,4 +232,162 @@ class TestAudioFingerprintDatabase:
 
         # Verify matches
         assert len(matches) > 0
-        assert all(len(match) == 2 for match in matches)  # track_id, confidence
\ No newline at end of file
+        assert all(len(match) == 2 for match in matches)  # track_id, confidence
+
+    def test_match_aligned_offsets(self, database):
+        rng = np.random.default_rng(0)
+        hashes = rng.choice(2 ** 31, size=200, replace=False).astype(np.uint32)
+        offsets = np.arange(200, dtype=np.int32)
+        freqs = np.zeros(200, dtype=np.int16)
+
+        # track1 holds the hashes in order, track2 the same hashes shuffled
+        database.insert_fingerprints({
+            "track1": Fingerprints(hashes, offsets, freqs, freqs),
+            "track2": Fingerprints(hashes, rng.permutation(offsets), freqs, freqs)
+        })
+
+        # A clip cut from track1 at offset 50 aligns under one time shift
+        sample = Fingerprints(hashes[50:150], offsets[:100], freqs[:100], freqs[:100])
+        matches = database.match_fingerprint(sample)
+
+        assert matches[0] == ("track1", 100)
+        assert all(confidence < 100 for _, confidence in matches[1:])
+        assert database.match_fingerprint(sample, max_results=1) == [("track1", 100)]
+
+    def test_match_approximate(self, tmp_path):
+        with AudioFingerprintDatabase(str(tmp_path / "lsh.db"), lsh=True) as database:
+            rng = np.random.default_rng(0)
+            hashes = rng.integers(0, 2 ** 32, 500, dtype=np.uint32)
+            offsets = np.arange(500, dtype=np.int32)
+            freqs = np.zeros(500, dtype=np.int16)
+            database.insert_fingerprints({"track1": Fingerprints(hashes, offsets, freqs, freqs)})
+
+            # Corrupt one bit in every sample hash: exact lookups all miss
+            noisy = hashes ^ (np.uint32(1) << rng.integers(0, 32, 500).astype(np.uint32))
+            sample = Fingerprints(noisy, offsets, freqs, freqs)
+
+            assert database.match_fingerprint(sample) == []
+            matches = database.match_fingerprint(sample, approximate=True)
+            assert matches[0][0] == "track1"
+            assert matches[0][1] >= 400
+
+    def test_enable_lsh_on_existing_database(self, tmp_path):
+        db_path = str(tmp_path / "late_lsh.db")
+        rng = np.random.default_rng(0)
+        hashes = rng.integers(0, 2 ** 32, 200, dtype=np.uint32)
+        offsets = np.arange(200, dtype=np.int32)
+        freqs = np.zeros(200, dtype=np.int16)
+        with AudioFingerprintDatabase(db_path) as database:
+            database.insert_fingerprints({"track1": Fingerprints(hashes, offsets, freqs, freqs)})
+
+        # Bands are backfilled for fingerprints stored before LSH was enabled
+        with AudioFingerprintDatabase(db_path, lsh=True) as database:
+            sample = Fingerprints(hashes ^ np.uint32(1), offsets, freqs, freqs)
+            matches = database.match_fingerprint(sample, approximate=True)
+            assert matches[0] == ("track1", 200)
+
+    def test_outdated_schema(self, tmp_path):
+        db_path = str(tmp_path / "old.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "CREATE TABLE fingerprints "
+            "(hash_value INTEGER, track_id TEXT, time_offset INTEGER, freq1 INTEGER, freq2 INTEGER)"
+        )
+        conn.close()
+
+        with pytest.raises(ValueError, match="outdated"):
+            AudioFingerprintDatabase(db_path)
+
+    def test_match_approximate_requires_lsh(self, database):
+        with pytest.raises(ValueError):
+            database.match_fingerprint(Fingerprints.empty(), approximate=True)
+
+    def test_match_with_index(self, database):
+        rng = np.random.default_rng(0)
+        freqs = np.zeros(300, dtype=np.int16)
+        database.insert_fingerprints({
+            f"track{i}": Fingerprints(
+                rng.integers(0, 500, 300).astype(np.uint32), 
+                rng.integers(0, 100, 300).astype(np.int32), freqs, freqs
+            )
+            for i in range(3)
+        })
+        sample = Fingerprints(
+            rng.integers(0, 500, 200).astype(np.uint32), 
+            rng.integers(0, 100, 200).astype(np.int32), freqs[:200], freqs[:200]
+        )
+
+        # The in-memory index scores exactly like the SQL path
+        expected = database.match_fingerprint(sample, threshold=1)
+        database.load_index()
+        assert sorted(database.match_fingerprint(sample, threshold=1)) == sorted(expected)
+
+        # Inserting drops the now stale index
+        database.insert_fingerprints({"track3": sample})
+        assert database._index is None
+
+    def test_load_index_concurrent_insert(self, database, monkeypatch):
+        hashes = np.arange(100, dtype=np.uint32)
+        offsets = np.arange(100, dtype=np.int32)
+        freqs = np.zeros(100, dtype=np.int16)
+        database.insert_fingerprints({"track1": Fingerprints(hashes, offsets, freqs, freqs)})
+
+        # Another thread commits right after the first snapshot is read
+        read_index, inserted = database._read_index, []
+        def read_then_insert():
+            index = read_index()
+            if not inserted:
+                inserted.append(True)
+                database.insert_fingerprints({"track2": Fingerprints(hashes + 100, offsets, freqs, freqs)})
+            return index
+        monkeypatch.setattr(database, "_read_index", read_then_insert)
+
+        index = database.load_index()
+
+        assert database._index is index
+        assert sorted(index.track_ids) == ["track1", "track2"]
+        sample = Fingerprints(hashes + 100, offsets, freqs, freqs)
+        assert database.match_fingerprint(sample) == [("track2", 100)]
+
+    def test_match_with_index_long_track(self, database):
+        # Deltas a multiple of 8192 frames apart must not be counted together
+        hashes = np.arange(100, dtype=np.uint32)
+        freqs = np.zeros(100, dtype=np.int16)
+        offsets = np.arange(100, dtype=np.int32) * 8193
+        offsets[50:] = offsets[50] + np.arange(50, dtype=np.int32)
+        database.insert_fingerprints({"track1": Fingerprints(hashes, offsets, freqs, freqs)})
+        sample = Fingerprints(hashes, np.arange(100, dtype=np.int32), freqs, freqs)
+
+        expected = database.match_fingerprint(sample, threshold=1)
+        database.load_index()
+        assert database.match_fingerprint(sample, threshold=1) == expected == [("track1", 50)]
+
+    def test_fingerprint_to_database(self, database, tmp_path):
+        test_files = [str(tmp_path / f"track{i}.wav") for i in range(3)]
+        for test_file in test_files:
+            sf.write(test_file, np.random.randn(16000) * 0.1, 16000)
+
+        track_ids = fingerprint_to_database(test_files, database, num_processes=2)
+
+        assert sorted(track_ids) == ["track0", "track1", "track2"]
+        with database._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(DISTINCT track_int) FROM fingerprints")
+            assert cursor.fetchone()[0] == 3
+
+    def test_fingerprint_to_database_failed_insert(self, database, tmp_path, monkeypatch):
+        test_files = [str(tmp_path / f"track{i}.wav") for i in range(3)]
+        for test_file in test_files:
+            sf.write(test_file, np.random.randn(16000) * 0.1, 16000)
+
+        insert_fingerprints = database.insert_fingerprints
+        def failing_insert(fingerprints_dict):
+            if "track1" in fingerprints_dict:
+                raise RuntimeError("disk full")
+            insert_fingerprints(fingerprints_dict)
+        monkeypatch.setattr(database, "insert_fingerprints", failing_insert)
+
+        # One track per transaction; the failed one is not reported
+        track_ids = fingerprint_to_database(test_files, database, num_processes=2, commit_rows=1)
+
+        assert sorted(track_ids) == ["track0", "track2"]